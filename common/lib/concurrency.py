@@ -0,0 +1,58 @@
+import os
+import time
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on in-flight requests, driven by observed latency.
+    Requests over the limit are rejected immediately (no queueing); low-priority
+    requests only get `low_priority_share` of the limit so cheap traffic keeps flowing.
+    Single event loop only: no locking.
+    """
+
+    def __init__(self, initial_limit: int = 32, min_limit: int = 8, max_limit: int = 512,
+                 target_latency_ms: float = 50.0, backoff: float = 0.9,
+                 low_priority_share: float = 0.7):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency_ms / 1000.0
+        self.backoff = backoff
+        self.low_priority_share = low_priority_share
+        self.in_flight = 0
+        self.rejected = 0
+        self._last_decrease = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveConcurrencyLimiter":
+        return cls(
+            initial_limit=int(os.getenv("CONCURRENCY_LIMIT_INITIAL", "32")),
+            min_limit=int(os.getenv("CONCURRENCY_LIMIT_MIN", "8")),
+            max_limit=int(os.getenv("CONCURRENCY_LIMIT_MAX", "512")),
+            target_latency_ms=float(os.getenv("CONCURRENCY_TARGET_MS", "50")),
+            low_priority_share=float(os.getenv("CONCURRENCY_LOW_PRIORITY_SHARE", "0.7")),
+        )
+
+    def try_acquire(self, high_priority: bool = True) -> bool:
+        cap = self.limit if high_priority else self.limit * self.low_priority_share
+        if self.in_flight >= max(1, int(cap)):
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, started_at: float, ok: bool = True) -> None:
+        """`started_at` is the time.monotonic() taken right after try_acquire()."""
+        self.in_flight -= 1
+        latency = time.monotonic() - started_at
+        if not ok or latency > self.target_latency:
+            # back off once per congestion event: ignore requests that started before the last cut
+            if started_at > self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = time.monotonic()
+        elif self.in_flight * 2 >= self.limit:
+            # only grow while the current limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def snapshot(self) -> dict:
+        return {"limit": int(self.limit), "in_flight": self.in_flight, "rejected": self.rejected}
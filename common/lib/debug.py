@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter, deque
+from typing import Optional
+
+MAX_PROFILE_SEC = 30
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler over sys._current_frames(), one capture at a time.
+    Output is collapsed stacks ("root;...;leaf count"), ready for flamegraph.pl / speedscope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def capture(self, seconds: float, hz: int = 100, thread_id: Optional[int] = None) -> str:
+        """Blocking; run it off the event loop. `thread_id=None` samples every thread."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("a profile capture is already running")
+        try:
+            me = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            counts: Counter = Counter()
+            period = 1.0 / hz
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for tid, frame in sys._current_frames().items():
+                    if tid == me or (thread_id is not None and tid != thread_id):
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(tid, f"thread-{tid}"))
+                    counts[";".join(reversed(stack))] += 1
+                time.sleep(period)
+            return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+        finally:
+            self._lock.release()
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop scheduling delay: a task sleeps `interval` and records how late it wakes up.
+    A watchdog thread logs the loop thread's stack when the loop has been blocked for more than
+    `slow_threshold`, i.e. the slow callback is caught while it is still running.
+    """
+
+    def __init__(self, interval_ms: float = 100.0, slow_threshold_ms: float = 100.0, window: int = 600):
+        self.interval = interval_ms / 1000.0
+        self.slow_threshold = slow_threshold_ms / 1000.0
+        self.samples: deque = deque(maxlen=window)
+        self.slow_callbacks = 0
+        self.last_tick = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "LoopLagMonitor":
+        return cls(
+            interval_ms=float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")),
+            slow_threshold_ms=float(os.getenv("SLOW_CALLBACK_MS", "100")),
+        )
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self.last_tick = time.monotonic()
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.samples.append(lag)
+            if lag > self.slow_threshold:
+                self.slow_callbacks += 1
+                print(f"[loop-lag] event loop blocked for {lag * 1000:.0f}ms")
+
+    def _watchdog(self) -> None:
+        reported = None
+        while not self._task.done():
+            time.sleep(self.slow_threshold / 2)
+            tick = self.last_tick
+            if tick == reported or time.monotonic() - tick < self.interval + self.slow_threshold:
+                continue
+            reported = tick
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                stack = "".join(traceback.format_stack(frame))
+                print(f"[loop-lag] slow callback still running after {self.slow_threshold * 1000:.0f}ms:\n{stack}")
+
+    def stats(self) -> dict:
+        data = sorted(self.samples)
+        if not data:
+            return {"samples": 0}
+
+        def pct(p: float) -> float:
+            return round(data[min(len(data) - 1, int(p * len(data)))] * 1000, 2)
+
+        return {
+            "samples": len(data),
+            "interval_ms": self.interval * 1000,
+            "p50_ms": pct(0.50),
+            "p90_ms": pct(0.90),
+            "p99_ms": pct(0.99),
+            "max_ms": round(data[-1] * 1000, 2),
+            "slow_callbacks": self.slow_callbacks,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+        }
+
+
+def install_debug(app) -> None:
+    """
+    Adds /debug/profile and /debug/loop-lag and starts the lag monitor. Off unless
+    DEBUG_ENDPOINTS_ENABLED=1: the routes are unauthenticated, so only enable them on
+    services that are not published.
+    """
+    if os.getenv("DEBUG_ENDPOINTS_ENABLED", "0") != "1":
+        return
+    # imported here so the gRPC (layered) image can use the profiler without FastAPI
+    from fastapi import APIRouter, HTTPException, Query
+    from fastapi.responses import PlainTextResponse
+    profiler = SamplingProfiler()
+    monitor = LoopLagMonitor.from_env()
+    router = APIRouter(prefix="/debug")
+
+    @router.get("/profile", response_class=PlainTextResponse)
+    async def profile(seconds: float = Query(default=5, gt=0, le=MAX_PROFILE_SEC),
+                      hz: int = Query(default=100, ge=1, le=1000),
+                      all_threads: bool = False):
+        loop_thread = None if all_threads else threading.get_ident()
+        try:
+            return await asyncio.to_thread(profiler.capture, seconds, hz, loop_thread)
+        except RuntimeError as e:
+            raise HTTPException(409, str(e))
+
+    @router.get("/loop-lag")
+    async def loop_lag():
+        return monitor.stats()
+
+    app.include_router(router)
+    app.add_event_handler("startup", monitor.start)
@@ -6,8 +6,13 @@ from concurrent import futures
 from redis.asyncio import Redis
 
 from repository.redis_repo import RedisRepository
+from persistence.cold_store import ColdStore
 from service.url_service import URLShortenerService
 from presentation.grpc_handlers import URLShortenerServicer
+from presentation.concurrency import ConcurrencyLimitInterceptor
+from presentation.debug import DebugServicer
+from common.lib.concurrency import AdaptiveConcurrencyLimiter
+from common.lib.debug import LoopLagMonitor
 import urlshortener_pb2_grpc
 
 async def serve():
@@ -20,8 +25,12 @@ async def serve():
     print(f"Redis URL: {redis_url}")
     print(f"gRPC Port: {grpc_port}")
     
+    cold_path = os.getenv("COLD_TIER_PATH")
+    if cold_path:
+        print(f"Cold tier: {cold_path}")
+    
     redis_client = Redis.from_url(redis_url, decode_responses=True)
-    repository = RedisRepository(redis_client)
+    repository = RedisRepository(redis_client, ColdStore(cold_path) if cold_path else None)
     
     try:
         await repository.ping()
@@ -36,9 +45,23 @@ async def serve():
     servicer = URLShortenerServicer(service)
     print("✓ Presentation Layer initialized")
     
-    server = grpc.aio.server(futures.ThreadPoolExecutor(max_workers=10))
+    interceptors = []
+    if os.getenv("CONCURRENCY_LIMIT_ENABLED", "1") == "1":
+        limiter = AdaptiveConcurrencyLimiter.from_env()
+        interceptors.append(ConcurrencyLimitInterceptor(limiter))
+        print(f"✓ Adaptive concurrency limit: initial={int(limiter.limit)}, "
+              f"target={limiter.target_latency * 1000:.0f}ms")
+    
+    server = grpc.aio.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=interceptors)
     urlshortener_pb2_grpc.add_URLShortenerServiceServicer_to_server(servicer, server)
     
+    # unauthenticated; nginx refuses DebugService, so it is only reachable on layered-net
+    if os.getenv("DEBUG_ENDPOINTS_ENABLED", "0") == "1":
+        monitor = LoopLagMonitor.from_env()
+        monitor.start()
+        urlshortener_pb2_grpc.add_DebugServiceServicer_to_server(DebugServicer(monitor), server)
+        print("✓ Debug service enabled (CaptureProfile, GetLoopLag)")
+    
     listen_addr = f'[::]:{grpc_port}'
     server.add_insecure_port(listen_addr)
     
@@ -0,0 +1,41 @@
+# Layer 1: Presentation / adaptive concurrency limiting for the gRPC server
+import time
+import grpc
+from common.lib.concurrency import AdaptiveConcurrencyLimiter
+
+
+class ConcurrencyLimitInterceptor(grpc.aio.ServerInterceptor):
+    """Rejects RPCs with RESOURCE_EXHAUSTED once the limiter is full."""
+    HIGH_PRIORITY = {"ResolveURL"}
+    EXEMPT = {"HealthCheck", "CaptureProfile", "GetLoopLag"}
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter):
+        self.limiter = limiter
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        method = handler_call_details.method.rsplit("/", 1)[-1]
+        if handler is None or handler.unary_unary is None or method in self.EXEMPT:
+            return handler
+
+        inner = handler.unary_unary
+        limiter = self.limiter
+        high = method in self.HIGH_PRIORITY
+
+        async def limited(request, context):
+            if not limiter.try_acquire(high):
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Server overloaded")
+            started = time.monotonic()
+            ok = False
+            try:
+                response = await inner(request, context)
+                ok = True
+                return response
+            finally:
+                limiter.release(started, ok)
+
+        return grpc.unary_unary_rpc_method_handler(
+            limited,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
@@ -0,0 +1,30 @@
+# Layer 1: Presentation / on-demand profiling and event-loop lag monitoring
+# (common/lib/debug.py monitor and profiler, exposed over gRPC)
+import asyncio
+import threading
+import grpc
+import urlshortener_pb2
+import urlshortener_pb2_grpc
+from common.lib.debug import MAX_PROFILE_SEC, LoopLagMonitor, SamplingProfiler
+
+
+class DebugServicer(urlshortener_pb2_grpc.DebugServiceServicer):
+    def __init__(self, monitor: LoopLagMonitor):
+        self.monitor = monitor
+        self.profiler = SamplingProfiler()
+
+    async def CaptureProfile(self, request, context):
+        seconds = request.seconds or 5
+        hz = request.hz or 100
+        if not (0 < seconds <= MAX_PROFILE_SEC and 1 <= hz <= 1000):
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                                f"seconds must be in (0, {MAX_PROFILE_SEC}], hz in [1, 1000]")
+        loop_thread = None if request.all_threads else threading.get_ident()
+        try:
+            stacks = await asyncio.to_thread(self.profiler.capture, seconds, hz, loop_thread)
+        except RuntimeError as e:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+        return urlshortener_pb2.CaptureProfileResponse(collapsed_stacks=stacks)
+
+    async def GetLoopLag(self, request, context):
+        return urlshortener_pb2.GetLoopLagResponse(**self.monitor.stats())
@@ -1,11 +1,27 @@
 # Layer 3: Repository / Data Access Layer
+import os
 import time
+import heapq
+import hashlib
 from typing import Optional, List, Tuple
 from redis.asyncio import Redis
+from persistence.cold_store import ColdStore
+from persistence.url_codec import URLCodec
+from persistence import repositories as shared
 
 class RedisRepository:
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Redis, cold_store: Optional[ColdStore] = None):
         self.redis = redis
+        # Optional cold tier for links idle longer than cold_after_sec
+        self.cold = cold_store
+        self.cold_after_sec = int(os.getenv("COLD_AFTER_SEC", str(7 * 24 * 3600)))
+        # url:{code} values are read as raw bytes and decoded here (raw or zstd+dictionary)
+        self.codec = URLCodec.from_env()
+        # Sharded click counters (layout and migration shared with persistence/repositories.py)
+        self.click_shards = max(1, int(os.getenv("CLICK_SHARDS", "1")))
+        self.click_shards_prev = max(1, int(os.getenv("CLICK_SHARDS_PREV", str(self.click_shards))))
+        self.click_top_cache_sec = float(os.getenv("CLICK_TOP_CACHE_SEC", "2"))
+        self._top_cache: Tuple[float, int, List[Tuple[str, int]]] = (0.0, 0, [])
         self.lua_resolve = """
         local url = redis.call('GET', KEYS[1])
         if not url then
@@ -26,12 +42,48 @@ class RedisRepository:
         return {200, url}
         """
     
+    def _click_shard_keys(self, shards: int) -> List[str]:
+        return shared.click_shard_keys(shards)
+
+    def _click_shard_key(self, code: str, shards: Optional[int] = None) -> str:
+        return shared.click_shard_key(code, shards or self.click_shards)
+
+    async def _top_click_scores(self, limit: int) -> List[Tuple[str, int]]:
+        keys = self._click_shard_keys(self.click_shards)
+        keys += [k for k in self._click_shard_keys(self.click_shards_prev) if k not in keys]
+        if len(keys) == 1:
+            members = await self.redis.zrevrange(keys[0], 0, limit - 1, withscores=True)
+            return [(code, int(score)) for code, score in members]
+        expires_at, cached_limit, cached = self._top_cache
+        if time.monotonic() < expires_at and cached_limit >= limit:
+            return cached[:limit]
+        # per-shard top `limit`, merged in process (no ZUNIONSTORE, no cross-slot command)
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrevrange(key, 0, limit - 1, withscores=True)
+        totals = {}
+        for members in await pipe.execute():
+            for code, score in members:
+                totals[code] = totals.get(code, 0) + score
+        top = [(code, int(score)) for code, score in heapq.nlargest(limit, totals.items(), key=lambda kv: kv[1])]
+        self._top_cache = (time.monotonic() + self.click_top_cache_sec, limit, top)
+        return top
+
+    async def _click_score(self, code: str) -> int:
+        # single-key ZSCOREs, no MULTI: the two shard keys may sit on different Cluster slots
+        pipe = self.redis.pipeline(transaction=False)
+        for key in dict.fromkeys([self._click_shard_key(code, self.click_shards),
+                                  self._click_shard_key(code, self.click_shards_prev)]):
+            pipe.zscore(key, code)
+        scores = await pipe.execute()
+        return int(sum(s for s in scores if s))
+
     async def store_url(self, code: str, long_url: str, 
                        ttl_sec: Optional[int] = None, 
                        max_clicks: Optional[int] = None) -> bool:
         try:
             url_key = f"url:{code}"
-            await self.redis.set(url_key, long_url)
+            await self.redis.set(url_key, await self.codec.encode(self.redis, long_url))
             if ttl_sec:
                 await self.redis.expire(url_key, ttl_sec)
             if max_clicks:
@@ -45,27 +97,66 @@ class RedisRepository:
             print(f"Error storing URL: {e}")
             return False
     
+    def _dedup_slot(self, long_url: str) -> Tuple[str, str]:
+        # same layout as persistence/repositories.py: dedup:{4 hex} -> {20 hex: code}
+        digest = hashlib.blake2b(long_url.encode(), digest_size=12).hexdigest()
+        return f"dedup:{digest[:4]}", digest[4:]
+
+    async def find_code_by_url(self, long_url: str) -> Optional[str]:
+        try:
+            key, field = self._dedup_slot(long_url)
+            return await self.redis.hget(key, field)
+        except Exception:
+            return None
+
+    async def index_url_code(self, long_url: str, code: str) -> bool:
+        try:
+            key, field = self._dedup_slot(long_url)
+            await self.redis.hsetnx(key, field, code)
+            return True
+        except Exception:
+            return False
+    
     async def get_url(self, code: str) -> Optional[str]:
         try:
-            return await self.redis.get(f"url:{code}")
+            raw = await self.redis.execute_command("GET", f"url:{code}", NEVER_DECODE=True)
+            url = await self.codec.decode(self.redis, raw)
+            if url is None and self.cold:
+                cold = await self.cold.get(code)   # read-only: does not promote
+                return cold[0] if cold else None
+            return url
         except Exception:
             return None
     
     async def resolve_url(self, code: str, count_click: bool = True) -> Tuple[int, str]:
         try:
             sha = await self.redis.script_load(self.lua_resolve)
-            status, url = await self.redis.evalsha(
-                sha, 2, f"url:{code}", f"rem_clicks:{code}",
-                1 if count_click else 0
+            status, raw = await self.redis.execute_command(
+                "EVALSHA", sha, 2, f"url:{code}", f"rem_clicks:{code}",
+                1 if count_click else 0, NEVER_DECODE=True
             )
-            return int(status), url
+            if int(status) == 404 and self.cold and await self._promote(code):
+                status, raw = await self.redis.execute_command(
+                    "EVALSHA", sha, 2, f"url:{code}", f"rem_clicks:{code}",
+                    1 if count_click else 0, NEVER_DECODE=True
+                )
+            return int(status), await self.codec.decode(self.redis, raw) if raw else ""
         except Exception as e:
             print(f"Error resolving URL: {e}")
             return 500, ""
     
+    async def _promote(self, code: str) -> bool:
+        return await shared.promote_cold_link(self.redis, code, self.cold, self.codec)
+
+    async def demote_idle_links(self, batch: int = 200) -> int:
+        # demote/promote/lock logic is shared with the microservices (persistence/repositories.py)
+        if not self.cold:
+            return 0
+        return await shared.demote_idle_links(self.redis, self.cold_after_sec, batch, self.cold, self.codec)
+
     async def increment_click(self, code: str) -> bool:
         try:
-            await self.redis.zincrby("zset:clicks", 1, code)
+            await self.redis.zincrby(self._click_shard_key(code), 1, code)
             await self.redis.hset(f"meta:{code}", "last_click", int(time.time()))
             return True
         except Exception:
@@ -73,9 +164,8 @@ class RedisRepository:
     
     async def get_top_links(self, limit: int = 10) -> List[Tuple[str, int, str]]:
         try:
-            members = await self.redis.zrevrange("zset:clicks", 0, limit - 1, withscores=True)
             result = []
-            for code, score in members:
+            for code, score in await self._top_click_scores(limit):
                 url = await self.get_url(code)
                 if url:
                     result.append((code, int(score), url))
@@ -83,6 +173,12 @@ class RedisRepository:
         except Exception:
             return []
     
+    async def get_top_clicks(self, limit: int = 10) -> List[Tuple[str, int]]:
+        return await self._top_click_scores(limit)
+
+    async def migrate_click_shards(self, batch: int = 500) -> int:
+        return await shared.migrate_click_shards(self.redis, batch, self.click_shards, self.click_shards_prev)
+    
     async def check_rate_limit(self, ip: str, limit: int, window_sec: int) -> Tuple[bool, int]:
         try:
             key = f"ratelimit:{ip}"
@@ -101,14 +197,14 @@ class RedisRepository:
     async def get_stats(self, code: str) -> Optional[dict]:
         try:
             meta = await self.redis.hgetall(f"meta:{code}")
-            clicks = await self.redis.zscore("zset:clicks", code)
             if not meta:
                 return None
+            clicks = await self._click_score(code)
             return {
                 "created_at": int(meta.get("created_at", 0)),
                 "max_clicks": int(meta.get("max_clicks", 0)),
                 "last_click": int(meta.get("last_click", 0)),
-                "total_clicks": int(clicks) if clicks else 0
+                "total_clicks": clicks
             }
         except Exception:
             return None
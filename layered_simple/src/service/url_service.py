@@ -13,6 +13,8 @@ class URLShortenerService:
         self.gateway_base_url = os.getenv("GATEWAY_BASE_URL", "http://localhost:8081")
         self.rate_limit = int(os.getenv("RL_LIMIT_PER_MIN", "120"))
         self.rate_window = int(os.getenv("RL_WINDOW_SEC", "60"))
+        # reuse codes for repeat shortens of permanent links (no TTL / max_clicks)
+        self.dedup_enabled = os.getenv("DEDUP_ENABLED", "0") == "1"
     
     def _generate_code(self, length: int = 7) -> str:
         return ''.join(secrets.choice(self.ALPHABET) for _ in range(length))
@@ -45,6 +47,12 @@ class URLShortenerService:
             return False, "", "", error
         
         ttl_sec = self._normalize_ttl(ttl_sec)
+        dedup = self.dedup_enabled and ttl_sec is None and not max_clicks
+        
+        if dedup:
+            existing_code = await self.repo.find_code_by_url(long_url)
+            if existing_code:
+                return True, existing_code, f"{self.gateway_base_url}/{existing_code}", ""
         
         code = None
         for _ in range(5):
@@ -61,6 +69,9 @@ class URLShortenerService:
         if not success:
             return False, "", "", "Failed to store URL"
         
+        if dedup:
+            await self.repo.index_url_code(long_url, code)
+        
         short_url = f"{self.gateway_base_url}/{code}"
         return True, code, short_url, ""
     
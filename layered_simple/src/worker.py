@@ -3,12 +3,20 @@ import os
 import asyncio
 import time
 from redis.asyncio import Redis
+from repository.redis_repo import RedisRepository
+from persistence.cold_store import ColdStore
 
 async def analytics_worker():
     redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
     interval = int(os.getenv("WORKER_INTERVAL", "10"))
     
+    cold_path = os.getenv("COLD_TIER_PATH")
+    demote_interval = int(os.getenv("COLD_DEMOTE_INTERVAL_SEC", "300"))
+    last_demote = 0.0
+    cold_links = 0  # full SQLite scan: refreshed after each demotion pass only
+    
     redis = Redis.from_url(redis_url, decode_responses=True)
+    repository = RedisRepository(redis, ColdStore(cold_path) if cold_path else None)
     
     print("Analytics Worker Started")
     print(f"Interval: {interval}s")
@@ -20,26 +28,40 @@ async def analytics_worker():
             iteration += 1
             print(f"[{time.strftime('%H:%M:%S')}] Iteration {iteration}")
             
-            total_links = 0
+            hot_links = 0
             cursor = 0
             while True:
                 cursor, keys = await redis.scan(cursor, match="url:*", count=100)
-                total_links += len(keys)
+                hot_links += len(keys)
                 if cursor == 0:
                     break
             
-            top = await redis.zrevrange("zset:clicks", 0, 0, withscores=True)
+            moved = await repository.migrate_click_shards()
+            if moved:
+                print(f"  Migrated {moved} click counters to {repository.click_shards} shards")
+            
+            if repository.cold and time.time() - last_demote >= demote_interval:
+                last_demote = time.time()
+                demoted = await repository.demote_idle_links()
+                cold_links = await repository.cold.count()
+                print(f"  Demoted {demoted} idle links to cold tier ({cold_links} cold)")
+            
+            total_links = hot_links + cold_links
+            top = await repository.get_top_clicks(1)
             top_code = top[0][0] if top else "none"
-            top_clicks = int(top[0][1]) if top else 0
+            top_clicks = top[0][1] if top else 0
             
             await redis.hset("stats:global", mapping={
                 "total_links": total_links,
+                "hot_links": hot_links,
+                "cold_links": cold_links,
                 "top_code": top_code,
                 "top_clicks": top_clicks,
                 "last_update": int(time.time())
             })
             
-            print(f"  Total links: {total_links}, Top: {top_code} ({top_clicks} clicks)")
+            print(f"  Total links: {total_links} ({hot_links} hot, {cold_links} cold), "
+                  f"Top: {top_code} ({top_clicks} clicks)")
             
             await asyncio.sleep(interval)
             
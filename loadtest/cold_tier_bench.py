@@ -0,0 +1,101 @@
+# Cold-tier latency benchmark.
+#   python loadtest/cold_tier_bench.py [rows]                      -> cold store lookups only
+#   REDIS_URL=redis://localhost:6379/0 python loadtest/cold_tier_bench.py  -> also hot vs cold-hit resolve
+# Run from the repo root.
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistence.cold_store import ColdStore
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] * 1e6
+
+
+def report(name, samples):
+    print(f"{name:<28} p50={pct(samples, 0.50):8.1f}us  p99={pct(samples, 0.99):8.1f}us  "
+          f"mean={statistics.mean(samples) * 1e6:8.1f}us  n={len(samples)}")
+
+
+def fill(store: ColdStore, rows: int) -> list:
+    codes = [f"c{i:07d}" for i in range(rows)]
+    conn = store._conn()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT OR REPLACE INTO links (code, long_url, expires_at_ms, remaining) VALUES (?, ?, ?, ?)",
+        ((c, f"https://example.com/articles/{c}?utm_source=bench&utm_medium=link", None, None) for c in codes),
+    )
+    conn.execute("COMMIT")
+    return codes
+
+
+async def bench_store(store: ColdStore, codes: list, n: int = 20000):
+    picks = [random.choice(codes) for _ in range(n)]
+    sync_lat = []
+    for code in picks:
+        t = time.perf_counter()
+        store.get_sync(code)
+        sync_lat.append(time.perf_counter() - t)
+    report("cold get (sqlite, sync)", sync_lat)
+
+    async_lat = []
+    for code in picks[: n // 4]:
+        t = time.perf_counter()
+        await store.get(code)
+        async_lat.append(time.perf_counter() - t)
+    report("cold get (to_thread)", async_lat)
+
+
+async def bench_resolve(store: ColdStore, n: int = 2000):
+    os.environ["COLD_TIER_PATH"] = store.path
+    from redis.asyncio import Redis
+    import persistence.repositories as repo
+    repo.COLD = store
+    redis = Redis.from_url(os.environ["REDIS_URL"], decode_responses=True)
+    codes = [f"bench{i:06d}" for i in range(n)]
+    for code in codes:
+        await repo.set_url(redis, code, f"https://example.com/{code}", None, None)
+
+    hot = []
+    for code in codes:
+        t = time.perf_counter()
+        await repo.resolve_and_account(redis, code, count_click=False)
+        hot.append(time.perf_counter() - t)
+    report("resolve, hot (Redis)", hot)
+
+    # demote everything by hand (idle threshold would take too long here)
+    for code in codes:
+        store.put_sync(code, f"https://example.com/{code}", None, None)
+        await redis.delete(f"url:{code}")
+    cold = []
+    for code in codes:
+        t = time.perf_counter()
+        await repo.resolve_and_account(redis, code, count_click=False)
+        cold.append(time.perf_counter() - t)
+    report("resolve, cold hit + promote", cold)
+
+    await redis.delete(*[f"url:{c}" for c in codes])
+    await redis.close()
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ColdStore(os.path.join(tmp, "cold.db"))
+        codes = fill(store, rows)
+        print(f"cold store rows: {rows}")
+        await bench_store(store, codes)
+        if os.getenv("REDIS_URL"):
+            await bench_resolve(store)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+// Resolve load past saturation, to compare the gateway with CONCURRENCY_LIMIT_ENABLED=1 vs 0.
+// 503s from the limiter are expected responses here; "goodput" counts only 301s.
+import http from 'k6/http';
+import { check, sleep } from 'k6';
+import { Counter, Trend } from 'k6/metrics';
+import { textSummary } from 'https://jslib.k6.io/k6-summary/0.0.4/index.js';
+
+const goodput = new Counter('goodput');
+const goodDuration = new Trend('good_req_duration', true);
+const shed = new Counter('shed');
+
+http.setResponseCallback(http.expectedStatuses(301, 503));
+
+export let options = {
+  stages: [
+    { duration: '30s', target: 100 },
+    { duration: '60s', target: 200 },
+    { duration: '60s', target: 400 },
+    { duration: '30s', target: 400 },
+  ],
+  summaryTrendStats: ['avg', 'med', 'p(95)', 'p(99)', 'max'],
+};
+
+const HOST  = __ENV.HOST || 'http://api-gateway:8080';
+const CODE  = __ENV.CODE;
+const PAUSE = Number(__ENV.SLEEP || 0.1);
+
+export default function () {
+  const ip = `10.${Math.floor(__VU/256)}.${__VU % 256}.${(__ITER % 250) + 1}`;
+  const res = http.get(`${HOST}/${CODE}`, {
+    redirects: 0,
+    headers: { 'X-Forwarded-For': ip },
+  });
+  if (res.status === 301) {
+    goodput.add(1);
+    goodDuration.add(res.timings.duration);
+  } else if (res.status === 503) {
+    shed.add(1);
+  }
+  check(res, { 'status is 301 or 503': (r) => r.status === 301 || r.status === 503 });
+  sleep(PAUSE);
+}
+
+export function handleSummary(data) {
+  const label = __ENV.RUN || 'saturation';
+  return {
+    [`/work/k6-${label}.json`]: JSON.stringify(data, null, 2),
+    stdout: textSummary(data, { indent: ' ', enableColors: true }),
+  };
+}
@@ -0,0 +1,114 @@
+# Gateway concurrency limiter past saturation, without Docker/k6.
+#   REDIS_URL=redis://localhost:6379/0 python loadtest/limiter_saturation.py [vus,vus,...] [seconds]
+# Starts redirect/analytics/ratelimit and the gateway (limiter on, then off) with uvicorn on
+# 127.0.0.1:18001-18003/18080, then runs closed-loop VUs shaped like k6-resolve.js
+# (GET /{code}, no redirects, rotating X-Forwarded-For, 100 ms pause). Run from the repo root.
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import subprocess
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = [("redirect_service", 18001), ("analytics_service", 18002), ("ratelimit_service", 18003)]
+GATEWAY_PORT = 18080
+
+
+def start(name: str, port: int, extra: dict = None) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=ROOT, RL_LIMIT_PER_MIN="1000000000",
+               GATEWAY_BASE_URL=f"http://localhost:{GATEWAY_PORT}", **(extra or {}))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.join(ROOT, "microservices_http", name), env=env,
+    )
+
+
+async def wait_up(url: str) -> None:
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"{url} did not come up")
+
+
+async def vu(client: httpx.AsyncClient, n: int, code: str, deadline: float, out: list) -> None:
+    it = 0
+    while time.monotonic() < deadline:
+        it += 1
+        ip = f"10.{n // 256}.{n % 256}.{it % 250 + 1}"
+        t = time.monotonic()
+        try:
+            r = await client.get(f"http://127.0.0.1:{GATEWAY_PORT}/{code}", headers={"X-Forwarded-For": ip})
+            status = r.status_code
+        except httpx.HTTPError:
+            status = 0
+        out.append((t, status, time.monotonic() - t))
+        await asyncio.sleep(0.1)
+
+
+def pct_ms(samples: list, p: float) -> float:
+    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1) if samples else 0.0
+
+
+async def load(vus: int, seconds: int, code: str, warmup: int = 5) -> dict:
+    limits = httpx.Limits(max_connections=vus + 10, max_keepalive_connections=vus + 10)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0, follow_redirects=False) as client:
+        out: list = []
+        began = time.monotonic()
+        await asyncio.gather(*[vu(client, n, code, began + warmup + seconds, out) for n in range(vus)])
+    window = [(s, lat) for t, s, lat in out if t >= began + warmup]
+    good = sorted(lat for s, lat in window if s == 301)
+    statuses: dict = {}
+    for s, _ in window:
+        statuses[s] = statuses.get(s, 0) + 1
+    return {"vus": vus, "goodput_rps": round(len(good) / seconds, 1),
+            "attempted_rps": round(len(window) / seconds, 1),
+            "p50_301_ms": pct_ms(good, 0.50), "p95_301_ms": pct_ms(good, 0.95), "statuses": statuses}
+
+
+async def main() -> None:
+    if not os.getenv("REDIS_URL"):
+        raise SystemExit("set REDIS_URL")
+    vus_list = [int(v) for v in (sys.argv[1] if len(sys.argv) > 1 else "50,200,400").split(",")]
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    procs = [start(name, port) for name, port in SERVICES]
+    gateway_env = {
+        "REDIRECT_URL": "http://127.0.0.1:18001",
+        "ANALYTICS_URL": "http://127.0.0.1:18002",
+        "RATELIMIT_URL": "http://127.0.0.1:18003",
+    }
+    try:
+        for _, port in SERVICES:
+            await wait_up(f"http://127.0.0.1:{port}/healthz")
+        async with httpx.AsyncClient() as client:
+            r = await client.post("http://127.0.0.1:18001/shorten", json={"long_url": "https://www.youtube.com"})
+            code = r.json()["code"]
+        for enabled in ("1", "0"):
+            gateway = start("api_gateway", GATEWAY_PORT, dict(gateway_env, CONCURRENCY_LIMIT_ENABLED=enabled))
+            try:
+                await wait_up(f"http://127.0.0.1:{GATEWAY_PORT}/healthz")
+                for vus in vus_list:
+                    result = await load(vus, seconds, code)
+                    result["limiter"] = "on" if enabled == "1" else "off"
+                    print(json.dumps(result), flush=True)
+                    await asyncio.sleep(3)
+            finally:
+                gateway.send_signal(signal.SIGINT)
+                gateway.wait(10)
+    finally:
+        for p in procs:
+            p.send_signal(signal.SIGINT)
+        for p in procs:
+            p.wait(10)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,33 @@
 # File: microservices_http/analytics_service/app.py
+import os
+import asyncio
 from typing import List, Dict
 from fastapi import FastAPI, HTTPException
 from persistence.redis_client import get_redis
-from persistence.repositories import zset_top, zset_increment, get_long_url
+from persistence.repositories import (zset_top, zset_increment, get_long_url, migrate_click_shards,
+                                      CLICK_SHARDS, CLICK_SHARDS_PREV)
+from common.lib.debug import install_debug
 
 app = FastAPI(title="analytics_service")
+install_debug(app)
 redis = get_redis()
+MIGRATE_INTERVAL_SEC = int(os.getenv("CLICK_MIGRATE_INTERVAL_SEC", "30"))
+
+async def click_shard_migrator():
+    # keep folding while old-layout writers may still be running
+    while True:
+        try:
+            moved = await migrate_click_shards(redis)
+            if moved:
+                print(f"click shards: migrated {moved} counters to {CLICK_SHARDS} shards")
+        except Exception as e:
+            print(f"click shard migration error: {e}")
+        await asyncio.sleep(MIGRATE_INTERVAL_SEC)
+
+@app.on_event("startup")
+async def startup():
+    if CLICK_SHARDS != CLICK_SHARDS_PREV:
+        app.state.migrator = asyncio.create_task(click_shard_migrator())
 
 @app.get("/healthz")
 async def healthz():
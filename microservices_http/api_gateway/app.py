@@ -1,11 +1,15 @@
 # File: microservices_http/api_gateway/app.py
 import os
+import time
 import httpx
 from fastapi import FastAPI, Request, HTTPException, Response
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse
 from common.lib.rate_limit import ShortenRequest, ShortenResponse
+from common.lib.concurrency import AdaptiveConcurrencyLimiter
+from common.lib.debug import install_debug
 
 app = FastAPI(title="api_gateway")
+install_debug(app)
 
 REDIRECT_URL   = os.getenv("REDIRECT_URL",   "http://redirect:8001")
 ANALYTICS_URL  = os.getenv("ANALYTICS_URL",  "http://analytics:8002")
@@ -13,6 +17,27 @@ RATELIMIT_URL  = os.getenv("RATELIMIT_URL",  "http://ratelimit:8003")
 
 client = httpx.AsyncClient(timeout=5.0)
 
+# Adaptive in-flight cap; create/analytics/stats are shed before redirects
+limiter = AdaptiveConcurrencyLimiter.from_env() if os.getenv("CONCURRENCY_LIMIT_ENABLED", "1") == "1" else None
+LOW_PRIORITY_PREFIXES = ("/analytics/", "/stats/")
+
+@app.middleware("http")
+async def concurrency_limit(req: Request, call_next):
+    path = req.url.path
+    if limiter is None or path == "/healthz" or path.startswith("/debug/"):
+        return await call_next(req)
+    high = req.method in ("GET", "HEAD") and not path.startswith(LOW_PRIORITY_PREFIXES)
+    if not limiter.try_acquire(high):
+        return JSONResponse({"detail": "Server overloaded"}, status_code=503, headers={"Retry-After": "1"})
+    started = time.monotonic()
+    ok = False
+    try:
+        response = await call_next(req)
+        ok = response.status_code < 500
+        return response
+    finally:
+        limiter.release(started, ok)
+
 def client_ip(req: Request) -> str:
     fwd = req.headers.get("x-forwarded-for")
     if fwd:
@@ -26,7 +51,8 @@ async def healthz():
         r = await client.get(f"{REDIRECT_URL}/healthz")
         a = await client.get(f"{ANALYTICS_URL}/healthz")
         t = await client.get(f"{RATELIMIT_URL}/healthz")
-        return {"gateway": "ok", "redirect": r.json(), "analytics": a.json(), "ratelimit": t.json()}
+        return {"gateway": "ok", "redirect": r.json(), "analytics": a.json(), "ratelimit": t.json(),
+                "limiter": limiter.snapshot() if limiter else None}
     except Exception as e:
         return {"gateway": "degraded", "error": str(e)}
 
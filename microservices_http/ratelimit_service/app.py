@@ -3,8 +3,10 @@ import os
 from fastapi import FastAPI, HTTPException, Request
 from persistence.redis_client import get_redis
 from common.lib.rate_limit import check_and_consume
+from common.lib.debug import install_debug
 
 app = FastAPI(title="ratelimit_service")
+install_debug(app)
 redis = get_redis()
 
 DEFAULT_LIMIT = int(os.getenv("RL_LIMIT_PER_MIN", "120"))
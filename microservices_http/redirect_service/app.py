@@ -1,18 +1,40 @@
 # File: microservices_http/redirect_service/app.py
 import os
 import time
+import asyncio
 from fastapi import FastAPI, HTTPException,Query
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError,BaseModel
 from common.lib.rate_limit import ShortenRequest, ShortenResponse, ResolveResponse
 from common.lib.codegen import random_code
 from common.lib.ttl import normalize_ttl
+from common.lib.debug import install_debug
 from persistence.redis_client import get_redis
-from persistence.repositories import set_url, resolve_and_account, get_stats, remaining_clicks, ttl_remaining
+from persistence.repositories import (set_url, resolve_and_account, get_stats, remaining_clicks, ttl_remaining,
+                                      dedup_lookup, dedup_record, DEDUP_ENABLED, url_exists,
+                                      demote_idle_links, COLD)
 
 app = FastAPI(title="redirect_service")
+install_debug(app)
 redis = get_redis()
 GATEWAY_BASE_URL = os.getenv("GATEWAY_BASE_URL", "http://localhost:8080")
+DEMOTE_INTERVAL_SEC = int(os.getenv("COLD_DEMOTE_INTERVAL_SEC", "300"))
+
+async def cold_tier_demoter():
+    # this service owns url:* keys, so it plays the worker's role for the cold tier
+    while True:
+        try:
+            demoted = await demote_idle_links(redis)
+            if demoted:
+                print(f"cold tier: demoted {demoted} idle links")
+        except Exception as e:
+            print(f"cold tier demotion error: {e}")
+        await asyncio.sleep(DEMOTE_INTERVAL_SEC)
+
+@app.on_event("startup")
+async def startup():
+    if COLD:
+        app.state.demoter = asyncio.create_task(cold_tier_demoter())
 
 @app.get("/healthz")
 async def healthz():
@@ -26,15 +48,23 @@ async def healthz():
 async def shorten(payload: ShortenRequest):
     ttl_sec = normalize_ttl(payload.ttl_sec)
     max_clicks = payload.max_clicks
+    long_url = str(payload.long_url)
+    dedup = DEDUP_ENABLED and ttl_sec is None and not max_clicks
+    if dedup:
+        code = await dedup_lookup(redis, long_url)
+        if code:
+            return ShortenResponse(code=code, short_url=f"{GATEWAY_BASE_URL}/{code}")
     # generate code; allow rare collisions by retry
     for _ in range(5):
         code = random_code(7)
-        key_exists = await redis.exists(f"url:{code}")
+        key_exists = await url_exists(redis, code)
         if not key_exists:
             break
     else:
         raise HTTPException(500, "Failed to allocate short code")
-    await set_url(redis, code, str(payload.long_url), ttl_sec, max_clicks)
+    await set_url(redis, code, long_url, ttl_sec, max_clicks)
+    if dedup:
+        await dedup_record(redis, long_url, code)
     return ShortenResponse(code=code, short_url=f"{GATEWAY_BASE_URL}/{code}")
 
 @app.get("/resolve/{code}", response_model=ResolveResponse)
@@ -0,0 +1,97 @@
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from typing import Optional, Tuple
+
+# (long_url, expires_at_ms or None, remaining_clicks or None)
+ColdLink = Tuple[str, Optional[int], Optional[int]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+  code TEXT PRIMARY KEY,
+  long_url TEXT NOT NULL,
+  expires_at_ms INTEGER,
+  remaining INTEGER
+) WITHOUT ROWID
+"""
+
+
+class ColdStore:
+    """
+    On-disk tier for links that went idle in Redis (SQLite, WAL, mmap reads).
+    One connection per thread; the async methods run the queries in the default executor.
+    """
+
+    def __init__(self, path: str, mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+            conn.execute(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get_sync(self, code: str) -> Optional[ColdLink]:
+        row = self._conn().execute(
+            "SELECT long_url, expires_at_ms, remaining FROM links WHERE code = ?", (code,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] <= int(time.time() * 1000):
+            return None  # TTL ran out while cold
+        return row
+
+    def put_sync(self, code: str, long_url: str, expires_at_ms: Optional[int], remaining: Optional[int]) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO links (code, long_url, expires_at_ms, remaining) VALUES (?, ?, ?, ?)",
+            (code, long_url, expires_at_ms, remaining),
+        )
+
+    def delete_sync(self, code: str) -> None:
+        self._conn().execute("DELETE FROM links WHERE code = ?", (code,))
+
+    def count_sync(self) -> int:
+        """Live (unexpired) rows; a full scan, so keep it off hot paths."""
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM links WHERE expires_at_ms IS NULL OR expires_at_ms > ?",
+            (int(time.time() * 1000),),
+        ).fetchone()[0]
+
+    def purge_expired_sync(self) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM links WHERE expires_at_ms IS NOT NULL AND expires_at_ms <= ?",
+            (int(time.time() * 1000),),
+        )
+        return cur.rowcount
+
+    async def get(self, code: str) -> Optional[ColdLink]:
+        return await asyncio.to_thread(self.get_sync, code)
+
+    async def put(self, code: str, long_url: str, expires_at_ms: Optional[int], remaining: Optional[int]) -> None:
+        await asyncio.to_thread(self.put_sync, code, long_url, expires_at_ms, remaining)
+
+    async def delete(self, code: str) -> None:
+        await asyncio.to_thread(self.delete_sync, code)
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(self.count_sync)
+
+    async def purge_expired(self) -> int:
+        return await asyncio.to_thread(self.purge_expired_sync)
+
+
+def get_cold_store() -> Optional[ColdStore]:
+    """COLD_TIER_PATH unset -> cold tier disabled."""
+    path = os.getenv("COLD_TIER_PATH")
+    if not path:
+        return None
+    return ColdStore(path)
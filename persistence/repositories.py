@@ -1,9 +1,43 @@
+import os
+import time
+import zlib
+import heapq
+import hashlib
 from typing import Optional, Tuple, List, Dict, Any
 from redis.asyncio import Redis
+from persistence.cold_store import ColdStore, get_cold_store
+from persistence.url_codec import URLCodec
 
 URL_KEY = "url:{code}"
 REMAIN_KEY = "rem_clicks:{code}"
 ZSET_CLICKS = "zset:clicks"  # (still used by analytics_service)
+ZSET_CLICKS_SHARD = "zset:clicks:{n}"
+
+# Click counters are spread over CLICK_SHARDS sorted sets (picked by crc32 of the code).
+# CLICK_SHARDS=1 keeps the single legacy "zset:clicks" key. To change the count online,
+# deploy with the new CLICK_SHARDS and CLICK_SHARDS_PREV=<old count>: reads merge both
+# layouts and migrate_click_shards() folds the old keys into the new ones.
+CLICK_SHARDS = max(1, int(os.getenv("CLICK_SHARDS", "1")))
+CLICK_SHARDS_PREV = max(1, int(os.getenv("CLICK_SHARDS_PREV", str(CLICK_SHARDS))))
+CLICK_TOP_CACHE_SEC = float(os.getenv("CLICK_TOP_CACHE_SEC", "2"))
+
+# Opt-in long-URL dedup: 96-bit digest -> code, kept in 65536 small hash buckets
+# (dedup:{first 4 hex}) so Redis stores them as compact listpacks.
+# Only permanent links (no ttl_sec / max_clicks) are indexed or reused.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "0") == "1"
+DEDUP_KEY = "dedup:{bucket}"
+
+# Optional cold tier (COLD_TIER_PATH): links idle in Redis for COLD_AFTER_SEC are moved to
+# an on-disk store by demote_idle_links(); a Redis miss falls through and promotes them back.
+COLD = get_cold_store()
+COLD_AFTER_SEC = int(os.getenv("COLD_AFTER_SEC", str(7 * 24 * 3600)))
+DEMOTE_LOCK_KEY = "demote:lock"
+DEMOTE_LOCK_MS = int(os.getenv("COLD_DEMOTE_LOCK_MS", str(10 * 60 * 1000)))
+
+# Optional dictionary compression of url:{code} values (URL_CODEC=zstd). Values are always
+# read as raw bytes (NEVER_DECODE) and passed through CODEC.decode, so raw and compressed
+# values can coexist whatever the current setting is.
+CODEC = URLCodec.from_env()
 
 # NEW: only decrement remaining clicks if count_click==1
 LUA_RESOLVE = """
@@ -28,46 +62,261 @@ end
 return {200, url}
 """
 
+# Drop the hot copy only if url / remaining clicks are unchanged since the snapshot
+LUA_DEMOTE = """
+-- KEYS[1]=url_key, KEYS[2]=remain_key
+-- ARGV[1]=url, ARGV[2]=remaining ('' = none)
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[2] then
+  return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+return 1
+"""
+
+# Release the demote pass lock only if this pass still owns it
+LUA_UNLOCK = """
+-- KEYS[1]=lock key; ARGV[1]=token
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Restore a cold link; NX so concurrent promotions cannot reset the click budget
+LUA_PROMOTE = """
+-- KEYS[1]=url_key, KEYS[2]=remain_key
+-- ARGV[1]=url, ARGV[2]=ttl_ms (0 = none), ARGV[3]=remaining ('' = none)
+if redis.call('SET', KEYS[1], ARGV[1], 'NX') then
+  if tonumber(ARGV[2]) > 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+  end
+  if ARGV[3] ~= '' then
+    redis.call('SET', KEYS[2], ARGV[3])
+  end
+end
+return 1
+"""
+
+def click_shard_keys(shards: int = CLICK_SHARDS) -> List[str]:
+    if shards == 1:
+        return [ZSET_CLICKS]
+    return [ZSET_CLICKS_SHARD.format(n=n) for n in range(shards)]
+
+def click_shard_key(code: str, shards: int = CLICK_SHARDS) -> str:
+    if shards == 1:
+        return ZSET_CLICKS
+    return ZSET_CLICKS_SHARD.format(n=zlib.crc32(code.encode()) % shards)
+
+def click_read_keys() -> List[str]:
+    keys = click_shard_keys(CLICK_SHARDS)
+    return keys + [k for k in click_shard_keys(CLICK_SHARDS_PREV) if k not in keys]
+
 async def set_url(redis: Redis, code: str, long_url: str,
                   ttl_sec: Optional[int], max_clicks: Optional[int]) -> None:
     url_key = URL_KEY.format(code=code)
-    await redis.set(url_key, long_url)
+    await redis.set(url_key, await CODEC.encode(redis, long_url))
     if ttl_sec:
         await redis.expire(url_key, ttl_sec)
     if max_clicks:
         await redis.set(REMAIN_KEY.format(code=code), int(max_clicks))
 
+def _dedup_slot(long_url: str) -> Tuple[str, str]:
+    digest = hashlib.blake2b(long_url.encode(), digest_size=12).hexdigest()
+    return DEDUP_KEY.format(bucket=digest[:4]), digest[4:]
+
+async def dedup_lookup(redis: Redis, long_url: str) -> Optional[str]:
+    key, field = _dedup_slot(long_url)
+    return await redis.hget(key, field)
+
+async def dedup_record(redis: Redis, long_url: str, code: str) -> None:
+    # NX: if two creates race, the first indexed code wins; both codes stay valid
+    key, field = _dedup_slot(long_url)
+    await redis.hsetnx(key, field, code)
+
 async def get_long_url(redis: Redis, code: str) -> Optional[str]:
-    return await redis.get(URL_KEY.format(code=code))
+    raw = await redis.execute_command("GET", URL_KEY.format(code=code), NEVER_DECODE=True)
+    url = await CODEC.decode(redis, raw)
+    if url is None and COLD:
+        cold = await COLD.get(code)   # read-only: does not promote
+        return cold[0] if cold else None
+    return url
+
+async def url_exists(redis: Redis, code: str) -> bool:
+    if await redis.exists(URL_KEY.format(code=code)):
+        return True
+    return bool(COLD and await COLD.get(code))
 
 # CHANGED: now takes count_click (True for GET, False for HEAD)
 async def resolve_and_account(redis: Redis, code: str, count_click: bool = True) -> Tuple[int, str]:
     sha = await redis.script_load(LUA_RESOLVE)
     url_key = URL_KEY.format(code=code)
     remain_key = REMAIN_KEY.format(code=code)
-    status, url = await redis.evalsha(
-        sha, 2, url_key, remain_key,
-        1 if count_click else 0
+    status, raw = await redis.execute_command(
+        "EVALSHA", sha, 2, url_key, remain_key,
+        1 if count_click else 0, NEVER_DECODE=True
+    )
+    if int(status) == 404 and COLD and await promote_cold_link(redis, code):
+        status, raw = await redis.execute_command(
+            "EVALSHA", sha, 2, url_key, remain_key,
+            1 if count_click else 0, NEVER_DECODE=True
+        )
+    return int(status), await CODEC.decode(redis, raw) if raw else ""
+
+async def promote_cold_link(redis: Redis, code: str, cold_store: Optional[ColdStore] = None,
+                            codec: Optional[URLCodec] = None) -> bool:
+    # cold_store/codec default to this module's; the layered RedisRepository passes its own
+    cold_store, codec = cold_store or COLD, codec or CODEC
+    cold = await cold_store.get(code)
+    if not cold:
+        return False
+    long_url, expires_at_ms, remaining = cold
+    ttl_ms = 0
+    if expires_at_ms is not None:
+        ttl_ms = max(1, expires_at_ms - int(time.time() * 1000))
+    sha = await redis.script_load(LUA_PROMOTE)
+    await redis.evalsha(
+        sha, 2, URL_KEY.format(code=code), REMAIN_KEY.format(code=code),
+        await codec.encode(redis, long_url), ttl_ms, "" if remaining is None else remaining
     )
-    return int(status), url
+    await cold_store.delete(code)
+    return True
+
+async def demote_idle_links(redis: Redis, idle_sec: int = COLD_AFTER_SEC, batch: int = 200,
+                            cold_store: Optional[ColdStore] = None, codec: Optional[URLCodec] = None) -> int:
+    """Move url:/rem_clicks: of links idle for idle_sec (OBJECT IDLETIME) into the cold tier."""
+    cold_store, codec = cold_store or COLD, codec or CODEC
+    if not cold_store:
+        return 0
+    # one pass at a time (all instances): overlapping passes would overwrite each
+    # other's cold rows with older snapshots
+    token = os.urandom(8).hex()
+    if not await redis.set(DEMOTE_LOCK_KEY, token, nx=True, px=DEMOTE_LOCK_MS):
+        return 0
+    try:
+        return await _demote_pass(redis, idle_sec, batch, cold_store, codec)
+    finally:
+        await redis.evalsha(await redis.script_load(LUA_UNLOCK), 1, DEMOTE_LOCK_KEY, token)
+
+async def _demote_pass(redis: Redis, idle_sec: int, batch: int, cold_store: ColdStore, codec: URLCodec) -> int:
+    sha = await redis.script_load(LUA_DEMOTE)
+    demoted = 0
+    cursor = 0
+    while True:
+        cursor, keys = await redis.scan(cursor, match="url:*", count=batch)
+        pipe = redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.object("idletime", key)
+        idle = await pipe.execute(raise_on_error=False)
+        for url_key, idle_for in zip(keys, idle):
+            if not isinstance(idle_for, int) or idle_for < idle_sec:
+                continue
+            code = url_key[len("url:"):]
+            remain_key = REMAIN_KEY.format(code=code)
+            # no MULTI here: NEVER_DECODE only applies to pipelined (non-transaction) replies;
+            # the compare-and-delete below catches any change since this snapshot
+            pipe = redis.pipeline(transaction=False)
+            pipe.execute_command("GET", url_key, NEVER_DECODE=True)
+            pipe.pttl(url_key)
+            pipe.get(remain_key)
+            raw, pttl, remaining = await pipe.execute()
+            if raw is None or pttl == -2:
+                continue  # expired/deleted since the scan (-2 would otherwise read as "no TTL")
+            # -1: no TTL; 0 is a real (imminent) expiry, not "permanent"
+            expires_at_ms = int(time.time() * 1000) + pttl if pttl >= 0 else None
+            # write cold copy first so the link is never missing from both tiers
+            long_url = await codec.decode(redis, raw)
+            await cold_store.put(code, long_url, expires_at_ms, None if remaining is None else int(remaining))
+            if await redis.evalsha(sha, 2, url_key, remain_key, raw, remaining or ""):
+                demoted += 1
+            elif await redis.exists(url_key):
+                # link changed since the snapshot: it stays hot. If url: is gone instead
+                # (expired, or demoted by a pass that outlived the lock) keep the cold row:
+                # the snapshot's expiry is real, so an expired link stays expired there.
+                await cold_store.delete(code)
+        if cursor == 0:
+            break
+    await cold_store.purge_expired()
+    return demoted
+
+# (expires at, limit, result) of the last merged leaderboard, per process
+_top_cache: Tuple[float, int, List[Tuple[str, int]]] = (0.0, 0, [])
 
 async def zset_top(redis: Redis, limit: int = 10) -> List[Tuple[str, int]]:
-    members = await redis.zrevrange(ZSET_CLICKS, 0, limit - 1, withscores=True)
-    return [(code, int(score)) for code, score in members]
+    global _top_cache
+    keys = click_read_keys()
+    if len(keys) == 1:
+        members = await redis.zrevrange(keys[0], 0, limit - 1, withscores=True)
+        return [(code, int(score)) for code, score in members]
+    expires_at, cached_limit, cached = _top_cache
+    if time.monotonic() < expires_at and cached_limit >= limit:
+        return cached[:limit]
+    # top `limit` of every shard, merged here: O(shards * limit) and no cross-slot command.
+    # A code only split across layouts mid-migration may rank from a partial sum.
+    pipe = redis.pipeline(transaction=False)
+    for key in keys:
+        pipe.zrevrange(key, 0, limit - 1, withscores=True)
+    totals: Dict[str, float] = {}
+    for members in await pipe.execute():
+        for code, score in members:
+            totals[code] = totals.get(code, 0) + score
+    top = [(code, int(score)) for code, score in heapq.nlargest(limit, totals.items(), key=lambda kv: kv[1])]
+    _top_cache = (time.monotonic() + CLICK_TOP_CACHE_SEC, limit, top)
+    return top
 
 async def zset_increment(redis: Redis, code: str) -> None:
-    await redis.zincrby(ZSET_CLICKS, 1, code)
+    await redis.zincrby(click_shard_key(code), 1, code)
+
+async def zset_score(redis: Redis, code: str) -> int:
+    # a code lives in one shard per layout; sum covers codes mid-migration.
+    # Plain pipeline of single-key ZSCOREs (the keys may sit on different Cluster slots);
+    # a read between a migration's two ZINCRBYs can come up short once, as documented.
+    pipe = redis.pipeline(transaction=False)
+    for key in dict.fromkeys([click_shard_key(code, CLICK_SHARDS),
+                              click_shard_key(code, CLICK_SHARDS_PREV)]):
+        pipe.zscore(key, code)
+    scores = await pipe.execute()
+    return int(sum(s for s in scores if s))
+
+async def migrate_click_shards(redis: Redis, batch: int = 500,
+                               shards: int = CLICK_SHARDS, prev_shards: int = CLICK_SHARDS_PREV) -> int:
+    """Move counters from their prev_shards key to their shards key where the two differ."""
+    if shards == prev_shards:
+        return 0
+    moved = 0
+    for old_key in click_shard_keys(prev_shards):
+        cursor = 0
+        while True:
+            cursor, members = await redis.zscan(old_key, cursor, count=batch)
+            # single-key ZINCRBYs (Cluster-safe): the amount taken from the old key is the
+            # amount added to the new one, so clicks landing mid-move or a second migrator
+            # never lose counts; a reader between the two commands sees the code short once
+            pipe = redis.pipeline(transaction=False)
+            for code, score in members:
+                new_key = click_shard_key(code, shards)
+                if new_key == old_key:
+                    continue
+                pipe.zincrby(old_key, -score, code)
+                pipe.zincrby(new_key, score, code)
+                moved += 1
+            await pipe.execute()
+            if cursor == 0:
+                break
+        await redis.zremrangebyscore(old_key, 0, 0)  # members fully moved out
+    return moved
 
 
 async def get_stats(redis, code: str) -> Optional[Dict[str, Any]]:
     meta = await redis.hgetall(f"meta:{code}")
     if not meta:
         return None
-    clicks = await redis.zscore("zset:clicks", code)
-    url = await redis.get(f"url:{code}")            # None if TTL expired / deleted
+    clicks = await zset_score(redis, code)
+    url = await get_long_url(redis, code)           # None if TTL expired / deleted
     return {
         "code": code,
-        "total_clicks": int(clicks) if clicks else 0,
+        "total_clicks": clicks,
         "created_at": int(meta.get("created_at", 0)),
         "expired": url is None
     }
@@ -75,7 +324,15 @@ async def get_stats(redis, code: str) -> Optional[Dict[str, Any]]:
 
 async def remaining_clicks(redis, code: str):
     v = await redis.get(f"rem_clicks:{code}")
+    if v is None and COLD:
+        cold = await COLD.get(code)
+        return cold[2] if cold else None
     return int(v) if v is not None else None
 
 async def ttl_remaining(redis, code: str):
-    return await redis.ttl(f"url:{code}")  # -2 missing, -1 no expire, >=0 seconds
+    ttl = await redis.ttl(f"url:{code}")  # -2 missing, -1 no expire, >=0 seconds
+    if ttl == -2 and COLD:
+        cold = await COLD.get(code)
+        if cold:
+            return -1 if cold[1] is None else max(0, (cold[1] - int(time.time() * 1000)) // 1000)
+    return ttl
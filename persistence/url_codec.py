@@ -0,0 +1,101 @@
+import os
+import time
+from typing import Dict, Optional, Union
+from redis.asyncio import Redis
+
+# Stored url:{code} values are either the raw URL (legacy / codec off) or
+#   b"\x00" | version (1 byte) | dict id (4 bytes, big endian) | payload
+# URLs never start with NUL, so both forms coexist and are told apart by the first byte.
+HEADER = b"\x00"
+VERSION_ZSTD_DICT = 1
+DICT_KEY = "codec:dict:{id}"
+DICT_CURRENT_KEY = "codec:dict:current"
+DICT_SEQ_KEY = "codec:dict:seq"
+
+
+def pack(dict_id: int, payload: bytes) -> bytes:
+    return HEADER + bytes([VERSION_ZSTD_DICT]) + dict_id.to_bytes(4, "big") + payload
+
+
+class URLCodec:
+    """
+    zstd + shared dictionary codec for long-URL values. Dictionaries live in Redis
+    (codec:dict:{id}); the active id is re-read every `refresh_sec` so rotations apply
+    without restarts. Old dictionaries are kept, so every stored value stays decodable.
+    zstandard is only imported when a dictionary is actually used.
+    """
+
+    def __init__(self, enabled: bool = False, level: int = 3, refresh_sec: float = 60.0):
+        self.enabled = enabled
+        self.level = level
+        self.refresh_sec = refresh_sec
+        self._decompressors: Dict[int, object] = {}
+        self._compressor = None
+        self._current_id: Optional[int] = None
+        self._checked_at = 0.0
+
+    @classmethod
+    def from_env(cls) -> "URLCodec":
+        return cls(
+            enabled=os.getenv("URL_CODEC", "none") == "zstd",
+            level=int(os.getenv("URL_CODEC_LEVEL", "3")),
+        )
+
+    async def _load_dict(self, redis: Redis, dict_id: int):
+        import zstandard
+        raw = await redis.execute_command("GET", DICT_KEY.format(id=dict_id), NEVER_DECODE=True)
+        if raw is None:
+            raise LookupError(f"url codec dictionary {dict_id} is missing")
+        return zstandard.ZstdCompressionDict(raw)
+
+    async def _refresh(self, redis: Redis) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_sec:
+            return
+        self._checked_at = now
+        try:
+            current = await redis.get(DICT_CURRENT_KEY)
+            dict_id = int(current) if current else None
+            if dict_id == self._current_id:
+                return
+            compressor = None
+            if dict_id is not None:
+                import zstandard
+                compressor = zstandard.ZstdCompressor(
+                    level=self.level, dict_data=await self._load_dict(redis, dict_id),
+                    write_checksum=False, write_dict_id=False,
+                )
+        except Exception:
+            self._checked_at = 0.0  # retry on the next write instead of pinning a failed load
+            raise
+        # switch only once the new dictionary is loaded
+        self._current_id = dict_id
+        self._compressor = compressor
+
+    async def encode(self, redis: Redis, long_url: str) -> Union[str, bytes]:
+        if not self.enabled:
+            return long_url
+        try:
+            await self._refresh(redis)
+        except Exception as e:
+            # keep the dictionary already loaded (or raw URLs); retried on the next write
+            print(f"url codec: dictionary refresh failed: {e}")
+        if self._compressor is None:
+            return long_url  # no dictionary trained yet
+        packed = pack(self._current_id, self._compressor.compress(long_url.encode()))
+        return packed if len(packed) < len(long_url) else long_url
+
+    async def decode(self, redis: Redis, raw: Union[str, bytes, None]) -> Optional[str]:
+        if raw is None or isinstance(raw, str):
+            return raw
+        if not raw.startswith(HEADER):
+            return raw.decode()
+        if raw[1] != VERSION_ZSTD_DICT:
+            raise ValueError(f"unknown url codec version {raw[1]}")
+        dict_id = int.from_bytes(raw[2:6], "big")
+        dctx = self._decompressors.get(dict_id)
+        if dctx is None:
+            import zstandard
+            dctx = zstandard.ZstdDecompressor(dict_data=await self._load_dict(redis, dict_id))
+            self._decompressors[dict_id] = dctx
+        return dctx.decompress(raw[6:]).decode()
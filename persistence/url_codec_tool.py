@@ -0,0 +1,171 @@
+# Train, rotate and measure url:{code} compression dictionaries.
+#   python -m persistence.url_codec_tool train [--sample 20000] [--dict-size 16384] [--activate]
+#   python -m persistence.url_codec_tool activate <dict_id>
+#   python -m persistence.url_codec_tool report [--sample 20000] [--dict <dict_id>] [--level N]
+#   python -m persistence.url_codec_tool recompress [--level N]
+# Uses REDIS_URL like the services; --level defaults to URL_CODEC_LEVEL. Dictionaries are never deleted, so values written with
+# an older dictionary stay readable; `recompress` rewrites them with the current one
+# (or back to raw URLs when no dictionary is current).
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from typing import List, Tuple
+from redis.asyncio import Redis
+from persistence.redis_client import get_redis
+from persistence.url_codec import URLCodec, pack, HEADER, DICT_KEY, DICT_CURRENT_KEY, DICT_SEQ_KEY
+
+LUA_REPLACE = """
+-- KEYS[1]=url_key; ARGV[1]=expected value, ARGV[2]=new value
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+  return 1
+end
+return 0
+"""
+
+
+async def scan_values(redis: Redis, limit: int = 0, batch: int = 500):
+    """Yields (url_key, raw stored value) for url:* keys, up to `limit` (0 = all)."""
+    seen = 0
+    cursor = 0
+    while True:
+        cursor, keys = await redis.scan(cursor, match="url:*", count=batch)
+        pipe = redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.execute_command("GET", key, NEVER_DECODE=True)
+        for key, raw in zip(keys, await pipe.execute()):
+            if raw is None:
+                continue
+            yield key, raw
+            seen += 1
+            if limit and seen >= limit:
+                return
+        if cursor == 0:
+            return
+
+
+async def sample_urls(redis: Redis, codec: URLCodec, limit: int) -> List[str]:
+    return [await codec.decode(redis, raw) async for _, raw in scan_values(redis, limit)]
+
+
+async def train(redis: Redis, sample: int, dict_size: int, activate: bool) -> int:
+    import zstandard
+    urls = await sample_urls(redis, URLCodec(), sample)
+    if not urls:
+        raise SystemExit("no url:* keys to train on")
+    trained = zstandard.train_dictionary(dict_size, [u.encode() for u in urls])
+    dict_id = await redis.incr(DICT_SEQ_KEY)
+    await redis.set(DICT_KEY.format(id=dict_id), trained.as_bytes())
+    print(f"trained dictionary {dict_id}: {len(trained.as_bytes())} bytes from {len(urls)} URLs")
+    if activate:
+        await redis.set(DICT_CURRENT_KEY, dict_id)
+        print(f"dictionary {dict_id} is now current")
+    return dict_id
+
+
+async def activate(redis: Redis, dict_id: int) -> None:
+    if not await redis.exists(DICT_KEY.format(id=dict_id)):
+        raise SystemExit(f"dictionary {dict_id} does not exist")
+    await redis.set(DICT_CURRENT_KEY, dict_id)
+    print(f"dictionary {dict_id} is now current (services pick it up within a minute)")
+
+
+def _timed(fn, values) -> Tuple[list, List[float]]:
+    out, lat = [], []
+    for v in values:
+        t = time.perf_counter()
+        out.append(fn(v))
+        lat.append(time.perf_counter() - t)
+    return out, lat
+
+
+def _pct_us(lat: List[float], p: float) -> float:
+    lat = sorted(lat)
+    return lat[min(len(lat) - 1, int(p * len(lat)))] * 1e6
+
+
+async def report(redis: Redis, sample: int, dict_id: int = 0, level: int = 3) -> None:
+    import zstandard
+    codec = URLCodec()
+    stored = [raw async for _, raw in scan_values(redis, sample)]
+    if not stored:
+        raise SystemExit("no url:* keys to sample")
+    urls = [await codec.decode(redis, raw) for raw in stored]
+    dict_id = dict_id or int(await redis.get(DICT_CURRENT_KEY) or 0)
+    if not dict_id:
+        raise SystemExit("no current dictionary; run `train --activate` first")
+    zdict = zstandard.ZstdCompressionDict(
+        await redis.execute_command("GET", DICT_KEY.format(id=dict_id), NEVER_DECODE=True))
+    cctx = zstandard.ZstdCompressor(level=level, dict_data=zdict, write_checksum=False, write_dict_id=False)
+    dctx = zstandard.ZstdDecompressor(dict_data=zdict)
+
+    packed, enc_lat = _timed(lambda u: pack(dict_id, cctx.compress(u.encode())), urls)
+    packed = [p if len(p) < len(u) else u.encode() for p, u in zip(packed, urls)]
+    _, dec_lat = _timed(lambda p: dctx.decompress(p[6:]) if p.startswith(HEADER) else p, packed)
+
+    raw_bytes = sum(len(u.encode()) for u in urls)
+    packed_bytes = sum(len(p) for p in packed)
+    stored_bytes = sum(len(r) for r in stored)
+    already = sum(1 for r in stored if r.startswith(HEADER))
+    n = len(urls)
+    print(f"sample: {n} links ({already} already compressed), dictionary {dict_id}, level {level}")
+    print(f"avg value bytes: raw {raw_bytes / n:.1f}, compressed {packed_bytes / n:.1f}, "
+          f"as stored now {stored_bytes / n:.1f}")
+    print(f"ratio: {raw_bytes / packed_bytes:.2f}x; saved per million links: "
+          f"{(raw_bytes - packed_bytes) / n * 1e6 / 2**20:.1f} MiB of value payload")
+    print(f"encode p50/p99: {_pct_us(enc_lat, 0.5):.1f}/{_pct_us(enc_lat, 0.99):.1f}us; "
+          f"decode p50/p99: {_pct_us(dec_lat, 0.5):.1f}/{_pct_us(dec_lat, 0.99):.1f}us "
+          f"(mean {statistics.mean(dec_lat) * 1e6:.1f}us)")
+
+
+async def recompress(redis: Redis, level: int = 3) -> None:
+    codec = URLCodec(enabled=True, level=level)
+    sha = await redis.script_load(LUA_REPLACE)
+    current = pack(int(await redis.get(DICT_CURRENT_KEY) or 0), b"")[:6]
+    rewritten = 0
+    async for key, raw in scan_values(redis):
+        if raw.startswith(current):
+            continue
+        new = await codec.encode(redis, await codec.decode(redis, raw))
+        new = new.encode() if isinstance(new, str) else new
+        if new != raw:
+            rewritten += await redis.evalsha(sha, 1, key, raw, new)
+    print(f"recompressed {rewritten} values")
+
+
+async def main(argv: List[str]) -> None:
+    level = URLCodec.from_env().level
+    parser = argparse.ArgumentParser(prog="url_codec_tool")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("train")
+    p.add_argument("--sample", type=int, default=20000)
+    p.add_argument("--dict-size", type=int, default=16384)
+    p.add_argument("--activate", action="store_true")
+    p = sub.add_parser("activate")
+    p.add_argument("dict_id", type=int)
+    p = sub.add_parser("report")
+    p.add_argument("--sample", type=int, default=20000)
+    p.add_argument("--dict", type=int, default=0)
+    p.add_argument("--level", type=int, default=level)
+    p = sub.add_parser("recompress")
+    p.add_argument("--level", type=int, default=level)
+    args = parser.parse_args(argv)
+
+    redis = get_redis()
+    try:
+        if args.cmd == "train":
+            await train(redis, args.sample, args.dict_size, args.activate)
+        elif args.cmd == "activate":
+            await activate(redis, args.dict_id)
+        elif args.cmd == "report":
+            await report(redis, args.sample, args.dict, args.level)
+        elif args.cmd == "recompress":
+            await recompress(redis, args.level)
+    finally:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))